@@ -1,11 +1,13 @@
 # main.py
 
 import os, sys, json
+from typing import Optional
 from langchain.agents import initialize_agent
 from langchain_ollama import ChatOllama
 from utils.tools import available_tools
 from agents.langgraph_agent import debug_tool_issue_v2 as langgraph_debug
 from agents.langgraph_agent import init_llms
+from utils.profiler import PROFILE_ENABLED, profile_request
 
 
 llm = ChatOllama(model="deepseek-coder")
@@ -19,10 +21,24 @@ legacy_agent = initialize_agent(
     handle_parsing_errors=True
 )
 
-def debug_tool_issue(input_description: str) -> str:
+def debug_tool_issue(input_description: str, profile: Optional[bool] = None) -> str:
     init_llms()
     print("🤖 Agent analyzing...")
-    return langgraph_debug(input_description) if USE_LANGGRAPH else legacy_agent.run(input_description)
+    profile = PROFILE_ENABLED if profile is None else profile
+    profiler = None
+    result = ""
+    try:
+        with profile_request(profile) as profiler:
+            result = langgraph_debug(input_description) if USE_LANGGRAPH else legacy_agent.run(input_description)
+    except Exception as e:
+        result = f"❌ Request failed: {e}"
+        raise
+    finally:
+        # Failing requests are the ones most worth profiling, so always write it out
+        if profiler:
+            base = profiler.write(result)
+            print(f"📊 Profile written: {base}.collapsed, {base}.alloc.txt")
+    return result
 
 def pretty_print_json(json_str: str):
     print("\n🔧 Suggested Fix:\n")
@@ -45,7 +61,7 @@ def load_file_content(path: str) -> str:
     except Exception as e:
         return f"❌ Error reading file: {e}"
 
-def run_tests():
+def run_tests(profile: Optional[bool] = None):
     tests = [
         ("Basic Logic Test", "def f(x): return -x if x < 0 else x", "abs"),
         ("Truncate Bug", "def summarize(txt): return txt[:100]", "summarize"),
@@ -53,7 +69,7 @@ def run_tests():
     ]
     for name, input_text, expected in tests:
         print(f"\n🧪 Test: {name}")
-        out = debug_tool_issue(input_text)
+        out = debug_tool_issue(input_text, profile=profile)
         if expected in out:
             print("✅ Passed")
         else:
@@ -61,13 +77,16 @@ def run_tests():
             pretty_print_json(out)
 
 def main():
-    if len(sys.argv) > 1 and sys.argv[1] == "--test":
-        run_tests()
+    profile = True if "--profile" in sys.argv[1:] else None
+    if "--test" in sys.argv[1:]:
+        run_tests(profile=profile)
         return
 
     print("🧠 AutoAgent Debugger")
     print("Type 'exit' to quit. Use 'file:<path>' to load a file.")
     print(f"Mode: {'LangGraph' if USE_LANGGRAPH else 'Legacy'}")
+    if profile or PROFILE_ENABLED:
+        print("📊 Profiling enabled")
 
     while True:
         inp = input("> ").strip()
@@ -79,7 +98,7 @@ def main():
             print(f"\n📂 Loaded file `{path}`")
         if not inp: continue
         try:
-            result = debug_tool_issue(inp)
+            result = debug_tool_issue(inp, profile=profile)
             pretty_print_json(result)
         except Exception as e:
             print(f"❌ Error: {e}")
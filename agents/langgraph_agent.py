@@ -10,11 +10,11 @@ from langchain_ollama import ChatOllama  # ✅ new import
 
 
 from typing import TypedDict, List
+from contextlib import closing
 import time
 import json
 import os
 import sys
-import re
 
 # Ensure utils/tools are accessible
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -25,6 +25,8 @@ from utils.tools import (
     rank_bug_severity,
     generate_unit_tests,
 )
+from utils.stream_parser import StreamingJSONParser, extract_json_object
+from utils.profiler import node_scope
 
 # 🧠 LLM Setup
 parser = StructuredOutputParser.from_response_schemas([
@@ -33,6 +35,7 @@ parser = StructuredOutputParser.from_response_schemas([
     ResponseSchema(name="suggested_fix", description="Fix if bug found"),
     ResponseSchema(name="severity", description="Bug severity: low/medium/critical")
 ])
+SCHEMA_FIELDS = tuple(schema.name for schema in parser.response_schemas)
 
 
 def get_llm_with_fallback(model_list=["phi3:mini", "mistral"]):
@@ -59,11 +62,30 @@ def init_llms():
     if llm is None or parsed_llm is None:
         parsed_llm, llm = get_llm_with_fallback()
 
+def stream_structured_response(user_input: str):
+    """Streams the LLM response and stops generation as soon as the JSON object closes."""
+    prompt = f"{user_input}\n\n{parser.get_format_instructions()}"
+    stream_parser = StreamingJSONParser(SCHEMA_FIELDS)
+    try:
+        # closing() drops the HTTP stream on early exit so Ollama stops generating
+        with closing(llm.stream([HumanMessage(content=prompt)])) as stream:
+            for chunk in stream:
+                if stream_parser.feed(chunk.content):
+                    break
+    except Exception as e:
+        print("⚠️ Streaming failed:", e)
+
+    if not stream_parser.finish():
+        print("📤 Incomplete streamed response:\n", stream_parser.text.strip()[:200])
+        return None
+    return stream_parser.result
+
 # Timer decorator
 def timed_node(func):
     def wrapper(state: dict) -> dict:
         start = time.time()
-        result = func(state)
+        with node_scope(func.__name__):
+            result = func(state)
         end = time.time()
         print(f"⏱️ Node '{func.__name__}' took {round(end - start, 2)} sec\n")
         return result
@@ -80,7 +102,11 @@ def agent_node(state: dict) -> dict:
     severity = "low"
 
     try:
-        parsed = parsed_llm.invoke(user_input)
+        parsed = stream_structured_response(user_input)
+        if parsed is None:
+            parsed = parsed_llm.invoke(user_input)
+        if not any(field in parsed for field in SCHEMA_FIELDS):
+            raise ValueError("Parsed response has none of the schema fields.")
         explanation = parsed.get("explanation", "")
         bug_found = parsed.get("bug_found", False)
         suggested_fix = parsed.get("suggested_fix", "")
@@ -91,9 +117,8 @@ def agent_node(state: dict) -> dict:
         try:
             raw_response = llm.invoke([HumanMessage(content=user_input)]).content
             print("📤 Raw fallback LLM response:\n", raw_response)
-            match = re.search(r"\{.*\}", raw_response, re.DOTALL)
-            if match:
-                parsed_fallback = json.loads(match.group(0))
+            parsed_fallback = extract_json_object(raw_response, SCHEMA_FIELDS)
+            if parsed_fallback is not None:
                 explanation = parsed_fallback.get("explanation", "")
                 bug_found = parsed_fallback.get("bug_found", False)
                 suggested_fix = parsed_fallback.get("suggested_fix", "")
@@ -171,11 +196,9 @@ def generate_tests_node(state: dict) -> dict:
     code = convert_to_messages(state["messages"])[0].content
     try:
         raw = generate_unit_tests(code)
-        match = re.search(r"json\n(.*?)", raw, re.DOTALL)
-        if match:
-            test_json = json.loads(match.group(1))
-        else:
-            test_json = json.loads(raw)
+        test_json = extract_json_object(raw, ("test_code",))
+        if test_json is None:
+            raise ValueError("No JSON object in test generation output.")
         test_code = test_json.get("test_code", "# ❌ No 'test_code' key.")
     except Exception as e:
         print(f"❌ JSON parsing failed: {e}")
@@ -0,0 +1,68 @@
+import json
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from langchain_core.messages import HumanMessage
+
+from agents import langgraph_agent
+
+
+# 🧠 Fake LLM whose stream() is a real generator, so we can see what gets pulled
+class StreamingLLM:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.pulled = 0
+        self.cancelled = False
+
+    def stream(self, messages):
+        try:
+            for chunk in self.chunks:
+                self.pulled += 1
+                yield SimpleNamespace(content=chunk)
+        except GeneratorExit:
+            self.cancelled = True
+            raise
+
+    def invoke(self, messages):
+        raise AssertionError("raw invoke fallback should not run")
+
+
+def run_agent_node():
+    state = {"messages": [HumanMessage(content="def summarize(txt): return txt[:100]")], "tool_outputs": []}
+    return json.loads(langgraph_agent.agent_node(state)["messages"][-1].content)
+
+
+def test_agent_node_stops_stream_once_object_closes():
+    llm = StreamingLLM([
+        'Here is the analysis:\n```json\n{"explanation": "summarize truncates", ',
+        '"bug_found": true, "suggested_fix": "return txt", "severity": "medium"}',
+        '\n```\nAdditionally, you might consider...',
+        ' more rambling that must never be generated',
+    ])
+    parsed_llm = MagicMock()
+    with patch.object(langgraph_agent, "llm", llm), patch.object(langgraph_agent, "parsed_llm", parsed_llm):
+        result = run_agent_node()
+
+    assert llm.pulled == 2
+    assert llm.cancelled
+    parsed_llm.invoke.assert_not_called()
+    assert result["bug_found"] is True
+    assert result["explanation"] == "summarize truncates"
+
+
+def test_agent_node_falls_back_when_stream_has_no_object():
+    llm = StreamingLLM(["I think the ", "function {} is fine."])
+    parsed_llm = MagicMock()
+    parsed_llm.invoke.return_value = {
+        "explanation": "Fallback summarize analysis.",
+        "bug_found": True,
+        "suggested_fix": "",
+        "severity": "low"
+    }
+    with patch.object(langgraph_agent, "llm", llm), patch.object(langgraph_agent, "parsed_llm", parsed_llm):
+        result = run_agent_node()
+
+    assert llm.pulled == 2
+    assert not llm.cancelled
+    parsed_llm.invoke.assert_called_once()
+    assert result["explanation"] == "Fallback summarize analysis."
@@ -0,0 +1,98 @@
+import os
+import time
+import threading
+import tracemalloc
+from utils.profiler import node_scope, profile_request
+
+
+def test_profile_request_attributes_samples_and_memory_to_nodes(tmp_path):
+    with profile_request() as profiler:
+        with node_scope("agent_node"):
+            data = []
+            for i in range(20000):
+                data.append(str(i) * 3)
+
+    assert profiler.node_stats["agent_node"]["calls"] == 1
+    assert profiler.node_stats["agent_node"]["mem_peak"] > 0
+    assert all(stack.split(";")[0] in ("request", "agent_node") for stack in profiler.samples)
+
+    base = profiler.write('{"bug_found": false}', output_dir=str(tmp_path))
+    for suffix in (".result.txt", ".collapsed", ".alloc.txt"):
+        assert os.path.exists(base + suffix)
+    with open(base + ".alloc.txt", encoding="utf-8") as f:
+        assert "agent_node: calls=1" in f.read()
+
+
+def test_node_scope_is_noop_without_profiling():
+    with profile_request(False) as profiler:
+        with node_scope("agent_node"):
+            pass
+    assert profiler is None
+
+
+def test_concurrent_requests_keep_separate_profiles():
+    a_started, b_done = threading.Event(), threading.Event()
+    profiles, errors = {}, []
+
+    def profiled(name, before=None, after=None):
+        try:
+            with profile_request() as profiler:
+                with node_scope(name):
+                    if before:
+                        before.set()
+                    if after:
+                        after.wait(5)
+            profiles[name] = profiler
+        except Exception as e:
+            errors.append(e)
+
+    def unprofiled():
+        a_started.wait(5)
+        with node_scope("unprofiled_node"):
+            pass
+        profiled("b_node")
+        b_done.set()
+
+    threads = [threading.Thread(target=profiled, args=("a_node", a_started, b_done)),
+               threading.Thread(target=unprofiled)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # b stops tracemalloc use first; a must still be able to snapshot
+    assert errors == []
+    assert set(profiles["a_node"].node_stats) == {"a_node"}
+    assert set(profiles["b_node"].node_stats) == {"b_node"}
+    assert not tracemalloc.is_tracing()
+
+
+def test_node_scope_stays_cheap_with_large_traced_heap():
+    with profile_request() as profiler:
+        heap = [str(i) for i in range(300000)]
+        start = time.time()
+        for _ in range(20):
+            with node_scope("empty_node"):
+                pass
+        elapsed = time.time() - start
+        del heap
+
+    assert elapsed < 0.5
+    assert profiler.node_stats["empty_node"]["calls"] == 20
+    assert not any(frame.startswith("profiler.py:") for stack in profiler.samples for frame in stack.split(";"))
+
+
+def test_overlapping_scopes_report_peak_as_na(tmp_path):
+    with profile_request() as profiler:
+        with node_scope("outer_node"):
+            with node_scope("inner_node"):
+                pass
+        with node_scope("solo_node"):
+            data = [bytes(1024) for _ in range(100)]
+            del data
+
+    assert profiler.node_stats["outer_node"]["mem_peak"] is None
+    assert profiler.node_stats["inner_node"]["mem_peak"] is None
+    assert profiler.node_stats["solo_node"]["mem_peak"] > 100 * 1024
+    with open(profiler.write("ok", output_dir=str(tmp_path)) + ".alloc.txt", encoding="utf-8") as f:
+        assert "outer_node: calls=1" in f.read()
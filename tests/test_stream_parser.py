@@ -0,0 +1,75 @@
+from utils.stream_parser import StreamingJSONParser, extract_json_object
+
+SCHEMA_FIELDS = ("explanation", "bug_found", "suggested_fix", "severity")
+
+
+def _feed_until_complete(chunks, expected_keys=None):
+    parser = StreamingJSONParser(expected_keys)
+    consumed = 0
+    for chunk in chunks:
+        consumed += 1
+        if parser.feed(chunk):
+            break
+    return parser, consumed
+
+
+def test_streaming_parser_stops_after_object_closes():
+    chunks = ['Sure!\n```json\n{"explanation": "Slices {text}", ', '"bug_found": true, "sugg',
+              'ested_fix": "return txt[:n]", "severity": "medium"}', '\n```\nLet me also explain...']
+    parser, consumed = _feed_until_complete(chunks, SCHEMA_FIELDS)
+
+    assert consumed == 3
+    assert parser.result == {
+        "explanation": "Slices {text}",
+        "bug_found": True,
+        "suggested_fix": "return txt[:n]",
+        "severity": "medium"
+    }
+
+
+def test_streaming_parser_exposes_fields_incrementally():
+    parser = StreamingJSONParser(SCHEMA_FIELDS)
+    parser.feed('{"explanation": "ok", "bug_found": false, ')
+    assert parser.fields == {"explanation": "ok", "bug_found": False}
+    assert not parser.complete
+
+
+def test_extract_json_object_skips_prose_braces():
+    raw = 'Use {braces} carefully.\n{"test_code": "def test_f():\\n    assert f({}) == 1"} trailing }'
+    assert extract_json_object(raw, ("test_code",)) == {"test_code": "def test_f():\n    assert f({}) == 1"}
+    assert extract_json_object("no json here") is None
+
+
+def test_streaming_parser_recovers_from_unbalanced_prose_brace():
+    chunks = ['Here: `d = {1: [2}` is invalid.\n', '{"explanation": "x", "bug_found": true}', ' and more {']
+    parser, consumed = _feed_until_complete(chunks, SCHEMA_FIELDS)
+    assert consumed == 2
+    assert parser.result == {"explanation": "x", "bug_found": True}
+
+
+def test_streaming_parser_recovers_from_quoted_prose_brace():
+    chunks = ['Fix: `print("{")`\n', '{"explanation": "x", "severity": "low"}', '\nThanks!']
+    parser, consumed = _feed_until_complete(chunks, SCHEMA_FIELDS)
+    assert consumed == 2
+    assert parser.result == {"explanation": "x", "severity": "low"}
+    assert extract_json_object("".join(chunks), SCHEMA_FIELDS) == {"explanation": "x", "severity": "low"}
+
+
+def test_expected_keys_skip_empty_and_example_dicts_in_prose():
+    empty = 'The default `{}` is mutable.\n```json\n{"explanation": "x", "bug_found": true}\n```'
+    example = 'Returns {"k": 1} for input.\n{"explanation": "y"}'
+    assert extract_json_object(empty, SCHEMA_FIELDS) == {"explanation": "x", "bug_found": True}
+    assert extract_json_object(example, SCHEMA_FIELDS) == {"explanation": "y"}
+
+
+def test_raw_newlines_in_string_values_are_accepted():
+    raw = '{"test_code": "def test_f():\n    assert f(1) == 1\n"}'
+    assert extract_json_object(raw, ("test_code",)) == {"test_code": "def test_f():\n    assert f(1) == 1\n"}
+
+
+def test_finish_accepts_object_after_unclosed_brace():
+    raw = 'Partial {"notes": [{"test_code": "assert True"}'
+    parser = StreamingJSONParser()
+    assert not parser.feed(raw)
+    assert parser.finish()
+    assert parser.result == {"test_code": "assert True"}
@@ -22,12 +22,14 @@ else:
         user_input = uploaded.read().decode("utf-8")
         st.info(f"Loaded `{uploaded.name}`")
 
+profile = st.checkbox("📊 Profile this request (CPU + memory)", value=False)
+
 if st.button("🔍 Analyze"):
     if not user_input.strip():
         st.warning("Please provide input.")
     else:
         with st.spinner("Analyzing…"):
-            result = debug_tool_issue(user_input)
+            result = debug_tool_issue(user_input, profile=profile or None)
 
         st.subheader("📤 Agent Response:")
 
@@ -0,0 +1,221 @@
+# utils/profiler.py
+
+import os
+import sys
+import time
+import itertools
+import threading
+import tracemalloc
+import contextvars
+from collections import Counter
+from contextlib import contextmanager
+from typing import Optional
+
+PROFILE_ENABLED = os.getenv("AGENT_PROFILE", "false").lower() in ("true", "1", "yes")
+PROFILE_DIR = os.getenv("AGENT_PROFILE_DIR", "profiles")
+
+# Per-context so concurrent Streamlit sessions never record into each other's profile
+_active = contextvars.ContextVar("agent_profiler", default=None)
+_request_ids = itertools.count(1)
+
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+_owns_tracemalloc = False
+_peak_scopes = []
+
+_PROFILER_FILES = (__file__, tracemalloc.__file__)
+_PROFILER_FILTERS = [tracemalloc.Filter(False, path) for path in _PROFILER_FILES]
+
+
+class _PeakScope:
+    """tracemalloc's peak is process-wide, so it only belongs to a node that ran alone."""
+
+    __slots__ = ("valid",)
+
+    def __init__(self, valid: bool):
+        self.valid = valid
+
+
+def _invalidate_peaks():
+    for scope in _peak_scopes:
+        scope.valid = False
+
+
+def _acquire_tracemalloc():
+    global _tracemalloc_users, _owns_tracemalloc
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _owns_tracemalloc = True
+        _tracemalloc_users += 1
+        if _tracemalloc_users > 1:
+            _invalidate_peaks()
+
+
+def _release_tracemalloc():
+    global _tracemalloc_users, _owns_tracemalloc
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0 and _owns_tracemalloc:
+            tracemalloc.stop()
+            _owns_tracemalloc = False
+
+
+def _enter_peak_scope() -> _PeakScope:
+    with _tracemalloc_lock:
+        scope = _PeakScope(not _peak_scopes and _tracemalloc_users == 1)
+        _invalidate_peaks()
+        _peak_scopes.append(scope)
+    tracemalloc.reset_peak()
+    return scope
+
+
+def _exit_peak_scope(scope: _PeakScope) -> bool:
+    with _tracemalloc_lock:
+        _peak_scopes.remove(scope)
+    return scope.valid
+
+
+class RequestProfiler:
+    """
+    Samples the stacks of threads running graph nodes every `interval` seconds and
+    tracks tracemalloc usage per node. Stacks are prefixed with the node name so the
+    collapsed output splits cleanly by node in a flamegraph. Memory figures come from
+    tracemalloc's process-wide counters minus the sampler's own allocations, so they blur when
+    profiled requests overlap; a node's peak is reported as n/a unless it ran alone.
+    """
+
+    def __init__(self, interval: float = 0.005, top: int = 25):
+        self.interval = interval
+        self.top = top
+        self.samples = Counter()
+        self.node_stats = {}
+        self.snapshot = None
+        self._threads = {}
+        self._stop = threading.Event()
+        self._sampler = None
+        self._own_bytes = 0
+
+    def start(self):
+        self._threads[threading.get_ident()] = "request"
+        _acquire_tracemalloc()
+        self._sampler = threading.Thread(target=self._sample_loop, name="agent-profiler", daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self._stop.set()
+        self._sampler.join()
+        try:
+            self.snapshot = tracemalloc.take_snapshot().filter_traces(_PROFILER_FILTERS + [
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            ])
+        finally:
+            _release_tracemalloc()
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.interval):
+            before, _ = tracemalloc.get_traced_memory()
+            frames = sys._current_frames()
+            for ident, label in list(self._threads.items()):
+                frame = frames.get(ident)
+                stack = self._collapse(label, frame) if frame is not None else None
+                if stack is not None:
+                    self.samples[stack] += 1
+            frames = frame = None
+            after, _ = tracemalloc.get_traced_memory()
+            # Stack keys retained by the sampler; nodes subtract this from their figures
+            self._own_bytes += after - before
+
+    @staticmethod
+    def _collapse(label: str, frame) -> Optional[str]:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            if code.co_filename in _PROFILER_FILES:
+                return None  # profiler bookkeeping, not the node's own work
+            stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        stack.append(label)
+        return ";".join(reversed(stack))
+
+    @contextmanager
+    def node(self, name: str):
+        ident = threading.get_ident()
+        previous = self._threads.get(ident)
+        self._threads[ident] = name
+        scope = _enter_peak_scope()
+        mem_before, _ = tracemalloc.get_traced_memory()
+        own_before = self._own_bytes
+        start = time.time()
+        try:
+            yield
+        finally:
+            elapsed = time.time() - start
+            mem_after, peak = tracemalloc.get_traced_memory()
+            own_growth = max(0, self._own_bytes - own_before)
+            peak_valid = _exit_peak_scope(scope)
+            if previous is None:
+                self._threads.pop(ident, None)
+            else:
+                self._threads[ident] = previous
+            stats = self.node_stats.setdefault(name, {"calls": 0, "seconds": 0.0, "mem_delta": 0, "mem_peak": None})
+            stats["calls"] += 1
+            stats["seconds"] += elapsed
+            stats["mem_delta"] += mem_after - mem_before - own_growth
+            if peak_valid:
+                stats["mem_peak"] = max(stats["mem_peak"] or 0, peak - mem_before - own_growth)
+
+    def collapsed_stacks(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common())
+
+    def allocation_summary(self) -> str:
+        lines = ["Per-node summary:"]
+        for name, stats in self.node_stats.items():
+            peak = "n/a" if stats["mem_peak"] is None else f"{stats['mem_peak'] / 1024:.1f} KiB"
+            lines.append(
+                f"  {name}: calls={stats['calls']} time={stats['seconds']:.3f}s "
+                f"mem_delta={stats['mem_delta'] / 1024:.1f} KiB peak={peak}"
+            )
+        lines.append("")
+        lines.append(f"Top {self.top} allocations at end of request:")
+        for stat in self.snapshot.statistics("lineno")[:self.top]:
+            lines.append(f"  {stat}")
+        return "\n".join(lines)
+
+    def write(self, result: str, output_dir: str = PROFILE_DIR) -> str:
+        os.makedirs(output_dir, exist_ok=True)
+        base = os.path.join(output_dir, time.strftime("%Y%m%d-%H%M%S") + f"-{os.getpid()}-{next(_request_ids)}")
+        with open(base + ".result.txt", "w", encoding="utf-8") as f:
+            f.write(result if isinstance(result, str) else str(result))
+        with open(base + ".collapsed", "w", encoding="utf-8") as f:
+            f.write(self.collapsed_stacks())
+        with open(base + ".alloc.txt", "w", encoding="utf-8") as f:
+            f.write(self.allocation_summary())
+        return base
+
+
+@contextmanager
+def node_scope(name: str):
+    """Attributes samples and memory to `name` while a request is being profiled; no-op otherwise."""
+    profiler = _active.get()
+    if profiler is None:
+        yield
+        return
+    with profiler.node(name):
+        yield
+
+
+@contextmanager
+def profile_request(enabled: bool = True):
+    if not enabled:
+        yield None
+        return
+    profiler = RequestProfiler()
+    profiler.start()
+    token = _active.set(profiler)
+    try:
+        yield profiler
+    finally:
+        _active.reset(token)
+        profiler.stop()
@@ -0,0 +1,176 @@
+# utils/stream_parser.py
+
+import json
+
+_DEAD = object()
+_CLOSED = object()
+
+
+def _loads(text: str):
+    # strict=False lets raw newlines through in strings, as small models emit multi-line code unescaped
+    return json.loads(text, strict=False)
+
+
+class _Candidate:
+    """Scan state for one `{` that may start the JSON object."""
+
+    __slots__ = ("start", "member_start", "stack", "in_string", "escaped", "expect_key", "fields")
+
+    def __init__(self, start: int):
+        self.start = start
+        self.member_start = start + 1
+        self.stack = ["{"]
+        self.in_string = False
+        self.escaped = False
+        self.expect_key = True
+        self.fields = {}
+
+    def step(self, buf: str, i: int, ch: str):
+        if self.in_string:
+            if self.escaped:
+                self.escaped = False
+            elif ch == "\\":
+                self.escaped = True
+            elif ch == '"':
+                self.in_string = False
+            return None
+
+        if ch in " \t\r\n":
+            return None
+        if self.expect_key:
+            if ch not in '"}':
+                return _DEAD
+            self.expect_key = False
+
+        if ch == '"':
+            self.in_string = True
+        elif ch in "{[":
+            self.stack.append(ch)
+            self.expect_key = ch == "{"
+        elif ch in "}]":
+            if self.stack.pop() != ("{" if ch == "}" else "["):
+                return _DEAD
+            if not self.stack:
+                self._close_member(buf, i)
+                return _CLOSED
+        elif ch == ",":
+            if len(self.stack) == 1:
+                self._close_member(buf, i)
+                self.member_start = i + 1
+            self.expect_key = self.stack[-1] == "{"
+        return None
+
+    def _close_member(self, buf: str, end: int):
+        member = buf[self.member_start:end].strip()
+        if not member:
+            return
+        try:
+            self.fields.update(_loads("{" + member + "}"))
+        except json.JSONDecodeError:
+            pass
+
+
+class StreamingJSONParser:
+    """
+    Consumes LLM output chunk by chunk and extracts the first top-level JSON object.
+    Every `{` is tracked as a candidate until it turns out not to be valid JSON, so stray
+    braces in prose don't hide the real object. With `expected_keys`, only objects holding at
+    least one of those keys are accepted, so `{}` or example dicts in prose are skipped.
+    Top-level fields are available in `fields` as soon as each value closes, and `feed()`
+    returns True once the object is complete so the caller can stop generating.
+    """
+
+    def __init__(self, expected_keys=None):
+        self.expected_keys = set(expected_keys) if expected_keys else None
+        self.result = None
+        self._buffer = ""
+        self._pos = 0
+        self._candidates = []
+        self._closed = []
+
+    @property
+    def text(self) -> str:
+        return self._buffer
+
+    @property
+    def complete(self) -> bool:
+        return self.result is not None
+
+    @property
+    def fields(self) -> dict:
+        if self.complete:
+            return dict(self.result)
+        for candidate in self._candidates:
+            if candidate.fields and self._wanted(candidate.fields):
+                return dict(candidate.fields)
+        return {}
+
+    def feed(self, chunk: str) -> bool:
+        if self.complete or not chunk:
+            return self.complete
+        self._buffer += chunk
+        buf = self._buffer
+        while self._pos < len(buf):
+            i = self._pos
+            ch = buf[i]
+            self._pos += 1
+
+            alive = []
+            for candidate in self._candidates:
+                state = candidate.step(buf, i, ch)
+                if state is _CLOSED:
+                    self._close(candidate, i)
+                elif state is not _DEAD:
+                    alive.append(candidate)
+            if ch == "{":
+                alive.append(_Candidate(i))
+            self._candidates = alive
+
+            if self._settle():
+                return True
+        return False
+
+    def finish(self) -> bool:
+        """Call at end of stream: accepts the earliest closed object even if an unclosed brace precedes it."""
+        if not self.complete and self._closed:
+            self.result = min(self._closed, key=lambda c: c[0])[1]
+        return self.complete
+
+    def _wanted(self, obj: dict) -> bool:
+        if self.expected_keys is None:
+            return True
+        return not self.expected_keys.isdisjoint(obj)
+
+    def _close(self, candidate: _Candidate, end: int):
+        try:
+            parsed = _loads(self._buffer[candidate.start:end + 1])
+        except json.JSONDecodeError:
+            return
+        if isinstance(parsed, dict) and self._wanted(parsed):
+            self._closed.append((candidate.start, parsed))
+
+    def _settle(self) -> bool:
+        # The earliest closed object wins, but only once no earlier candidate can still complete.
+        # With expected_keys, only earlier candidates already holding an expected field block it,
+        # so an unclosed prose brace can't delay the early stop.
+        if not self._closed:
+            return False
+        start, parsed = min(self._closed, key=lambda c: c[0])
+        for candidate in self._candidates:
+            if candidate.start >= start:
+                break
+            if self.expected_keys is None or self._wanted(candidate.fields):
+                return False
+        self.result = parsed
+        return True
+
+
+def extract_json_object(text: str, expected_keys=None):
+    """
+    Returns the first complete JSON object found in text (ignoring fences and prose), or None.
+    With expected_keys, the object must contain at least one of them.
+    """
+    parser = StreamingJSONParser(expected_keys)
+    parser.feed(text or "")
+    parser.finish()
+    return parser.result